@@ -0,0 +1,122 @@
+"""Fused propagator kernels for the Ding 2018 power spectrum model.
+
+These are optional accelerations for `PowerDing2018`. They are used, in order of preference, as
+
+1. An ahead-of-time compiled extension `_ding_kernels_aot`, which avoids paying the JIT compilation
+   cost in every fresh process (e.g., every walker/chain on a cluster). Build it once (requires numba) with
+
+       python -c "from barry.models._ding_kernels import build; build()"
+
+   which writes the shared library next to this file. Note the AOT build is serial, whereas the JIT
+   versions run in parallel over the outer grid dimension.
+2. numba JIT compiled (and disk-cached) versions of the functions below, if numba is installed. These are parallel,
+   so must not be launched from other threads: with numba's default workqueue threading layer the process can
+   hang on exit once they have been.
+3. Neither, in which case `load_kernels` returns None and the model uses plain numpy expressions.
+
+"""
+
+import os
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional
+    njit = None
+    prange = range
+
+# Exported signatures for the ahead-of-time build. The damping grids (and so the propagator) are in single precision
+# by default, but we also export double precision versions, suffixed by the numpy dtype character of the damping grids.
+AOT_SIGNATURES = {
+    "propagator_recon_iso": {
+        "f": "f4[:,:](f8[:], f8[:], f8[:], f4[:,:], f4[:,:], f4[:,:], f8, f8, f8)",
+        "d": "f8[:,:](f8[:], f8[:], f8[:], f8[:,:], f8[:,:], f8[:,:], f8, f8, f8)",
+    },
+    "propagator_aniso_recon": {
+        "f": "f4[:,:](f8[:,:], f8[:,:], f8[:,:], f4[:,:], f4[:,:], f4[:,:], f8, f8)",
+        "d": "f8[:,:](f8[:,:], f8[:,:], f8[:,:], f8[:,:], f8[:,:], f8[:,:], f8, f8)",
+    },
+}
+
+
+def propagator_recon_iso(mu, ks, smoothing_kernel, damping_dd, damping_sd, damping_ss, beta, b, b_delta):
+    """Fused isotropic post-reconstruction propagator on the (mu, k) grid, in the precision of the damping grids"""
+    nmu, nk = len(mu), len(ks)
+    propagator = np.empty((nmu, nk), dtype=damping_dd.dtype)
+    for i in prange(nmu):
+        kaiser_mu = beta * mu[i] ** 2
+        for j in range(nk):
+            smooth_prefac = smoothing_kernel[j] / b
+            bdelta_prefac = 0.5 * b_delta / b * ks[j] ** 2
+            kaiser_prefac = 1.0 - smooth_prefac + kaiser_mu * (1.0 - smoothing_kernel[j]) + bdelta_prefac
+            propagator[i, j] = (
+                (kaiser_prefac**2 - bdelta_prefac**2) * damping_dd[i, j]
+                + 2.0 * kaiser_prefac * smooth_prefac * damping_sd[i, j]
+                + smooth_prefac**2 * damping_ss[i, j]
+            )
+    return propagator
+
+
+def propagator_aniso_recon(kprime, sprime, kaiser_prefac, damping_dd, damping_sd, damping_ss, b, b_delta):
+    """Fused anisotropic post-reconstruction propagator on the (k, mu) grid, in the precision of the damping grids"""
+    nk, nmu = kprime.shape
+    propagator = np.empty((nk, nmu), dtype=damping_dd.dtype)
+    for i in prange(nk):
+        for j in range(nmu):
+            bdelta_prefac = 0.5 * b_delta / (b * kaiser_prefac[i, j]) * kprime[i, j] ** 2
+            smooth_prefac = sprime[i, j] / (b * kaiser_prefac[i, j])
+            kaiser_term = 1.0 + bdelta_prefac - smooth_prefac
+            propagator[i, j] = (
+                (kaiser_term**2 - bdelta_prefac**2) * damping_dd[i, j]
+                + 2.0 * kaiser_term * smooth_prefac * damping_sd[i, j]
+                + smooth_prefac**2 * damping_ss[i, j]
+            )
+    return propagator
+
+
+def _aot_dispatch(module, name):
+    """Picks the exported AOT function matching the dtype of the damping grids (the fourth argument)"""
+    funcs = {char: getattr(module, f"{name}_{char}") for char in AOT_SIGNATURES[name]}
+
+    def dispatch(*args):
+        return funcs[args[3].dtype.char](*args)
+
+    return dispatch
+
+
+def load_kernels():
+    """Returns the (isotropic, anisotropic) propagator kernels, or None for each if neither AOT nor JIT versions are
+    available, and whether the kernels can be called from threads other than the main one"""
+    try:
+        from barry.models import _ding_kernels_aot
+
+        return (
+            _aot_dispatch(_ding_kernels_aot, "propagator_recon_iso"),
+            _aot_dispatch(_ding_kernels_aot, "propagator_aniso_recon"),
+            True,
+        )
+    except ImportError:
+        pass
+
+    if njit is None:
+        return None, None, True
+
+    jit = njit(parallel=True, fastmath=True, cache=True)
+    return jit(propagator_recon_iso), jit(propagator_aniso_recon), False
+
+
+def build():
+    """Compiles the kernels ahead of time into the `_ding_kernels_aot` extension module"""
+    from numba.pycc import CC
+
+    cc = CC("_ding_kernels_aot")
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    for name, func in [("propagator_recon_iso", propagator_recon_iso), ("propagator_aniso_recon", propagator_aniso_recon)]:
+        for char, signature in AOT_SIGNATURES[name].items():
+            cc.export(f"{name}_{char}", signature)(func)
+    cc.compile()
+
+
+if __name__ == "__main__":
+    build()
@@ -1,3 +1,6 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 from scipy.integrate import simps
@@ -10,10 +13,32 @@ import numpy as np
 
 from barry.utils import break_vector_and_get_blocks
 
+# One thread pool shared by all models for computing their datasets in parallel, so that, e.g., a Fitter with many
+# models doesn't accumulate idle threads. Recreated in forked child processes, which don't inherit the threads.
+_dataset_executor = None
+_dataset_executor_pid = None
+_dataset_executor_lock = threading.Lock()
+
+
+def _get_dataset_executor():
+    global _dataset_executor, _dataset_executor_pid
+    with _dataset_executor_lock:
+        if _dataset_executor is None or _dataset_executor_pid != os.getpid():
+            _dataset_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+            _dataset_executor_pid = os.getpid()
+        return _dataset_executor
+
 
 class PowerSpectrumFit(Model):
     """Generic power spectrum model"""
 
+    # Whether compute_power_spectrum can be called from several threads at once. See compute_power_spectrum_batch
+    threadsafe = True
+
+    # Number of k grids to cache the polynomial basis for. A fit only uses a couple (e.g., the data's ks_input and camb.ks),
+    # so this is just a bound in case k is a new array every call.
+    poly_basis_cache_size = 16
+
     def __init__(
         self,
         name="Pk Basic",
@@ -79,6 +104,11 @@ class PowerSpectrumFit(Model):
                     raise ValueError("recon not recognised, must be 'iso', 'ani' or 'sym'")
                 self.recon = True
 
+        # Powers of k for the polynomial terms. The first is k^2 except for pre-recon isotropic fits, which use k.
+        self._poly_exponents = np.array([2.0 if (self.recon or not self.isotropic) else 1.0, 0.0, -1.0, -2.0, -3.0])
+        self._poly_basis = {}
+        self._add_poly = self.add_three_poly if n_poly == 3 else (self.add_five_poly if n_poly == 5 else self._noop_poly)
+
         self.declare_parameters()
 
         # Set up data structures for model fitting
@@ -87,10 +117,21 @@ class PowerSpectrumFit(Model):
         self.nmu = 100
         self.mu = np.linspace(0.0, 1.0, self.nmu)
 
+        # Simpson's rule is linear in the integrand, so on our fixed mu grid it reduces to a dot product with these weights
+        self._simps_w_mu = simps(np.eye(self.nmu), self.mu, axis=1)
+
         self.kvals = None
         self.pksmooth = None
         self.pkratio = None
 
+        # Whether to compute the models for each of the n_data constituent datasets in parallel threads, and a lock for
+        # any state (e.g., caches) those threads share. The lock can't be pickled, see __getstate__
+        self.parallel_datasets = True
+        self._lock = threading.Lock()
+
+        # Read-only arrays of zeros and ones, keyed on their length. See get_zeros_ones
+        self._zeros_ones = {}
+
     def set_marg(self, fix_params, poly_poles, n_poly, do_bias=False):
 
         if self.marg:
@@ -250,13 +291,13 @@ class PowerSpectrumFit(Model):
         return muprime
 
     def integrate_mu(self, pk2d, isotropic=False):
-        pk0 = simps(pk2d, self.mu, axis=1)
+        pk0 = pk2d @ self._simps_w_mu
         if isotropic:
             pk2 = None
             pk4 = None
         else:
-            pk2 = 3.0 * simps(pk2d * self.mu**2, self.mu)
-            pk4 = 1.125 * (35.0 * simps(pk2d * self.mu**4, self.mu, axis=1) - 10.0 * pk2 + 3.0 * pk0)
+            pk2 = 3.0 * (pk2d @ (self._simps_w_mu * self.mu**2))
+            pk4 = 1.125 * (35.0 * (pk2d @ (self._simps_w_mu * self.mu**4)) - 10.0 * pk2 + 3.0 * pk0)
             pk2 = 2.5 * (pk2 - pk0)
         return pk0, pk2, pk4
 
@@ -296,8 +337,9 @@ class PowerSpectrumFit(Model):
         # of code and a few nested if statements, but it's perhaps more readable and a little faster (because we only
         # need one interpolation for the whole isotropic monopole, rather than separately for the smooth and wiggle components)
 
+        zeros, ones = self.get_zeros_ones(len(k))
         if self.isotropic:
-            pk = [np.zeros(len(k))]
+            pk = [zeros]
             kprime = k if for_corr else k / p["alpha"]
             pk_smooth = splev(kprime, splrep(ks, pk_smooth_lin))
             if not for_corr:
@@ -307,13 +349,13 @@ class PowerSpectrumFit(Model):
                 pk[0] = pk_smooth if for_corr else pk_smooth
             else:
                 # Compute the propagator
-                C = np.ones(len(ks))
+                C = self.get_zeros_ones(len(ks))[1]
                 propagator = splev(kprime, splrep(ks, (1.0 + pk_ratio * C)))
                 pk[0] = pk_smooth * propagator
 
             poly = np.zeros((1, len(k)))
             if self.marg:
-                prefac = np.ones(len(kprime)) if smooth else propagator
+                prefac = ones if smooth else propagator
                 poly = prefac * [pk_smooth]
 
         else:
@@ -333,13 +375,13 @@ class PowerSpectrumFit(Model):
             if smooth:
                 pk2d = pk_smooth
             else:
-                C = np.ones(len(ks))
+                C = self.get_zeros_ones(len(ks))[1]
                 pk2d = pk_smooth * (1.0 + splev(kprime, splrep(ks, pk_ratio)) * C)
 
             pk0, pk2, pk4 = self.integrate_mu(pk2d)
 
             # Polynomial shape
-            pk = [pk0, np.zeros(len(k)), pk2, np.zeros(len(k)), pk4, np.zeros(len(k))]
+            pk = [pk0, zeros, pk2, zeros, pk4, zeros]
 
             if for_corr:
                 poly = None
@@ -348,12 +390,109 @@ class PowerSpectrumFit(Model):
                 if self.marg:
                     poly = np.zeros((1, 6, len(k)))
                     poly[0, :, :] = pk
-                    pk = [np.zeros(len(k))] * 6
+                    pk = [zeros] * 6
                 else:
                     poly = np.zeros((1, 6, len(k)))
 
         return kprime, pk, poly
 
+    def get_zeros_ones(self, n):
+        """Returns arrays of zeros and ones of length n, which are reused between calls rather than being reallocated
+        every time the model is computed. They are read-only because they are shared, so must be updated out of place.
+
+        Parameters
+        ----------
+        n : int
+            The length of the arrays
+
+        Returns
+        -------
+        zeros : np.ndarray
+            Read-only array of zeros
+        ones : np.ndarray
+            Read-only array of ones
+
+        """
+        arrays = self._zeros_ones.get(n)
+        if arrays is None:
+            arrays = (np.zeros(n), np.ones(n))
+            for a in arrays:
+                a.flags.writeable = False
+            self._zeros_ones[n] = arrays
+        return arrays
+
+    @staticmethod
+    def on_input_grid(kprime, ks):
+        """Whether kprime is the grid the model was computed on, in which case interpolating onto it can be skipped.
+        This is the case when computing the power spectrum for the correlation function, which passes in camb.ks."""
+        return kprime is ks or (kprime.shape == ks.shape and np.array_equal(kprime, ks))
+
+    def get_poly_basis(self, k):
+        """Returns the polynomial basis functions evaluated at k, as a (5, len(k)) design matrix.
+
+        The basis only depends on the k-grid, which for model fitting is the same array every call,
+        so we cache it on the identity of k (keeping a reference to k so the identity can't be reused).
+
+        Parameters
+        ----------
+        k : np.ndarray
+            Array of k values to evaluate the basis at
+
+        Returns
+        -------
+        basis : np.ndarray
+            The basis functions, ordered as the a_1 to a_5 polynomial parameters
+
+        """
+        cached = self._poly_basis.get(id(k))
+        if cached is None or cached[0] is not k:
+            if len(self._poly_basis) >= self.poly_basis_cache_size:
+                self._poly_basis.clear()
+            cached = (k, k ** self._poly_exponents[:, None])
+            self._poly_basis[id(k)] = cached
+        return cached[1]
+
+    def compute_power_spectrum_batch(self, k, ps, smooth=False, data_name=None):
+        """Calls compute_power_spectrum for each of a list of parameter dictionaries, one per constituent dataset.
+
+        The calls are independent and spend most of their time in numpy/scipy, which release the GIL,
+        so if `self.parallel_datasets` is set (and the model is `threadsafe`) they are spread over a small pool of threads.
+
+        Parameters
+        ----------
+        k : np.ndarray
+            Array of (undilated) k-values to compute the models at.
+        ps : list[dict]
+            The parameter dictionaries, one per dataset, as returned by `deal_with_ndata`
+        smooth : bool, optional
+            Whether or not to generate a smooth model without the BAO feature
+        data_name : str, optional
+            The name used to access precomputed values.
+
+        Returns
+        -------
+        results : list[tuple]
+            The (kprime, pk, poly) tuples returned by compute_power_spectrum for each parameter dictionary
+
+        """
+        ncpu = os.cpu_count() or 1
+        if not (self.parallel_datasets and self.threadsafe) or len(ps) < 2 or ncpu < 2:
+            return [self.compute_power_spectrum(k, p, smooth=smooth, data_name=data_name) for p in ps]
+
+        executor = _get_dataset_executor()
+        futures = [executor.submit(self.compute_power_spectrum, k, p, smooth=smooth, data_name=data_name) for p in ps]
+        return [future.result() for future in futures]
+
+    def __getstate__(self):
+        # Models are pickled to send them to other processes (e.g., with a multiprocessing pool for the sampler)
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
     def add_three_poly(self, k, kpoly, p, prefac, pk):
         """Returns the polynomial components for 3 terms per multipole
 
@@ -379,38 +518,7 @@ class PowerSpectrumFit(Model):
 
         """
 
-        if self.isotropic:
-            if self.recon:
-                shape = p["a{0}_1"] * k**2 + p["a{0}_2"] + p["a{0}_3"] / k
-            else:
-                shape = p["a{0}_1"] * k + p["a{0}_2"] + p["a{0}_3"] / k
-
-            poly = np.zeros((1, len(kpoly)))
-            if self.marg:
-                poly = prefac * [pk, kpoly, np.ones(len(kpoly)), 1.0 / kpoly]
-                if self.recon:
-                    poly[1] *= kpoly
-            poly = poly[:, None, :]
-        else:
-            shape = np.zeros((6, len(k)))
-            if self.marg:
-                poly = np.zeros((3 * len(self.poly_poles) + 1, 6, len(kpoly)))
-                poly[0, :, :] = pk
-                for i, pole in enumerate(self.poly_poles):
-                    if self.recon:
-                        poly[3 * i + 1 : 3 * (i + 1) + 1, pole] = [kpoly**2, np.ones(len(kpoly)), 1.0 / kpoly]
-                    else:
-                        poly[3 * i + 1 : 3 * (i + 1) + 1, pole] = [kpoly**2, np.ones(len(kpoly)), 1.0 / kpoly]
-
-            else:
-                poly = np.zeros((1, 6, len(kpoly)))
-                for pole in self.poly_poles:
-                    if self.recon:
-                        shape[pole] = p[f"a{{{pole}}}_1"] * k**2 + p[f"a{{{pole}}}_2"] + p[f"a{{{pole}}}_3"] / k
-                    else:
-                        shape[pole] = p[f"a{{{pole}}}_1"] * k**2 + p[f"a{{{pole}}}_2"] + p[f"a{{{pole}}}_3"] / k
-
-        return shape, poly
+        return self._add_poly_terms(3, k, kpoly, p, prefac, pk)
 
     def add_five_poly(self, k, kpoly, p, prefac, pk):
         """Returns the polynomial components for 5 terms per multipole
@@ -437,61 +545,58 @@ class PowerSpectrumFit(Model):
 
         """
 
+        return self._add_poly_terms(5, k, kpoly, p, prefac, pk)
+
+    def _noop_poly(self, k, kpoly, p, prefac, pk):
+        """Returns the polynomial components when there are no polynomial terms, i.e., zero shape and only the
+        bias term for analytical marginalisation"""
+        return self._add_poly_terms(0, k, kpoly, p, prefac, pk)
+
+    def _add_poly_terms(self, n, k, kpoly, p, prefac, pk):
+        """Returns the polynomial components for the first n terms per multipole, used by add_three_poly and add_five_poly
+
+        Parameters
+        ----------
+        n : int
+            The number of polynomial terms per multipole, from 0 to 5
+        k : np.ndarray
+            Array of k values for the shape terms
+        kpoly : np.ndarray
+            Array of k values for the marginalised polynomial array
+        p : dict
+            dictionary of parameter name to float value pairs
+        prefac : np.ndarray
+            Prefactors to be added to the front of the analytically marginalised polynomial
+        pk : np.ndarray
+            the power spectrum components without polynomials
+
+        Returns
+        -------
+        shape : np.ndarray
+            The polynomial terms to be added directly to each multipole
+        poly: np.ndarray
+            The additive terms in the model not added to the multipoles, necessary for analytical marginalisation
+
+        """
         if self.isotropic:
-            if self.recon:
-                shape = p["a{0}_1"] * k**2 + p["a{0}_2"] + p["a{0}_3"] / k + p["a{0}_4"] / (k * k) + p["a{0}_5"] / (k**3)
-            else:
-                shape = p["a{0}_1"] * k + p["a{0}_2"] + p["a{0}_3"] / k + p["a{0}_4"] / (k * k) + p["a{0}_5"] / (k**3)
+            shape = np.array([p[f"a{{0}}_{i + 1}"] for i in range(n)]) @ self.get_poly_basis(k)[:n]
 
             poly = np.zeros((1, len(kpoly)))
             if self.marg:
-                poly = prefac * [pk, kpoly, np.ones(len(kpoly)), 1.0 / kpoly, 1.0 / (kpoly * kpoly), 1.0 / (kpoly**3)]
-                if self.recon:
-                    poly[1] *= kpoly
+                poly = prefac * np.vstack([pk, self.get_poly_basis(kpoly)[:n]])
             poly = poly[:, None, :]
-
         else:
             shape = np.zeros((6, len(k)))
+            basis = self.get_poly_basis(kpoly)[:n]
             if self.marg:
-                poly = np.zeros((5 * len(self.poly_poles) + 1, 6, len(kpoly)))
+                poly = np.zeros((n * len(self.poly_poles) + 1, 6, len(kpoly)))
                 poly[0, :, :] = pk
                 for i, pole in enumerate(self.poly_poles):
-                    if self.recon:
-                        poly[5 * i + 1 : 5 * (i + 1) + 1, pole] = [
-                            kpoly**2,
-                            np.ones(len(kpoly)),
-                            1.0 / kpoly,
-                            1.0 / (kpoly * kpoly),
-                            1.0 / (kpoly**3),
-                        ]
-                    else:
-                        poly[5 * i + 1 : 5 * (i + 1) + 1, pole] = [
-                            kpoly**2,
-                            np.ones(len(kpoly)),
-                            1.0 / kpoly,
-                            1.0 / (kpoly * kpoly),
-                            1.0 / (kpoly**3),
-                        ]
-
+                    poly[n * i + 1 : n * (i + 1) + 1, pole] = basis
             else:
                 poly = np.zeros((1, 6, len(kpoly)))
                 for pole in self.poly_poles:
-                    if self.recon:
-                        shape[pole] = (
-                            p[f"a{{{pole}}}_1"] * kpoly**2
-                            + p[f"a{{{pole}}}_2"]
-                            + p[f"a{{{pole}}}_3"] / kpoly
-                            + p[f"a{{{pole}}}_4"] / (kpoly * kpoly)
-                            + p[f"a{{{pole}}}_5"] / (kpoly**3)
-                        )
-                    else:
-                        shape[pole] = (
-                            p[f"a{{{pole}}}_1"] * kpoly**2
-                            + p[f"a{{{pole}}}_2"]
-                            + p[f"a{{{pole}}}_3"] / kpoly
-                            + p[f"a{{{pole}}}_4"] / (kpoly * kpoly)
-                            + p[f"a{{{pole}}}_5"] / (kpoly**3)
-                        )
+                    shape[pole] = np.array([p[f"a{{{pole}}}_{i + 1}"] for i in range(n)]) @ basis
 
         return shape, poly
 
@@ -673,17 +778,13 @@ class PowerSpectrumFit(Model):
         """
 
         # Loop over the constituent (correlated) datasets in d and generate their models
-        all_pks = []
-        all_polys = []
-        for i in range(d["ndata"]):
-            p = self.deal_with_ndata(params, i)
-
-            # Generate the underlying models
-            ks, pks, poly = self.compute_power_spectrum(d["ks_input"], p, smooth=smooth, data_name=data_name)
-            all_pks.append(pks)
-            all_polys.append(poly)
+        ps = [self.deal_with_ndata(params, i) for i in range(d["ndata"])]
 
-        all_polys = np.array(all_polys)
+        # Generate the underlying models
+        results = self.compute_power_spectrum_batch(d["ks_input"], ps, smooth=smooth, data_name=data_name)
+        ks = results[-1][0]
+        all_pks = [pks for _, pks, _ in results]
+        all_polys = np.array([poly for _, _, poly in results])
 
         # Morph it into a model representative of our survey and its selection/window/binning effects
         # Split the model into even and odd components
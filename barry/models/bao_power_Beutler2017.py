@@ -115,8 +115,9 @@ class PowerBeutler2017(PowerSpectrumFit):
             if "b" not in p:
                 p = self.deal_with_ndata(p, 0)
 
+        zeros, ones = self.get_zeros_ones(len(k))
         if self.isotropic:
-            pk = [np.zeros(len(k))]
+            pk = [zeros]
             kprime = k if for_corr else k / p["alpha"]
             if self.dilate_smooth:
                 pk_smooth = splev(kprime, splrep(ks, pk_smooth_lin)) / (1.0 + kprime**2 * p["sigma_s"] ** 2 / 2.0) ** 2
@@ -126,20 +127,18 @@ class PowerBeutler2017(PowerSpectrumFit):
                 pk_smooth *= p["b"]
 
             if smooth:
-                propagator = np.ones(len(kprime))
+                propagator = ones
             else:
                 # Compute the propagator
                 C = np.exp(-0.5 * kprime**2 * p["sigma_nl"] ** 2)
                 propagator = 1.0 + splev(kprime, splrep(ks, pk_ratio)) * C
-            prefac = np.ones(len(kprime)) if smooth else propagator
+            prefac = ones if smooth else propagator
 
             if for_corr:
                 poly = None
                 pk[0] = pk_smooth * propagator
             else:
-                shape, poly = (
-                    self.add_three_poly(k, k, p, prefac, pk_smooth) if self.n_poly == 3 else self.add_five_poly(k, k, p, prefac, pk_smooth)
-                )
+                shape, poly = self._add_poly(k, k, p, prefac, pk_smooth)
                 pk[0] = (pk_smooth + shape) * propagator
 
         else:
@@ -172,22 +171,18 @@ class PowerBeutler2017(PowerSpectrumFit):
             pk0, pk2, pk4 = self.integrate_mu(pk2d)
 
             # Polynomial shape
-            pk = [pk0, np.zeros(len(k)), pk2, np.zeros(len(k)), pk4, np.zeros(len(k))]
+            pk = [pk0, zeros, pk2, zeros, pk4, zeros]
 
             if for_corr:
                 poly = None
                 kprime = k
             else:
-                shape, poly = (
-                    self.add_three_poly(k, k, p, np.ones(len(k)), pk)
-                    if self.n_poly == 3
-                    else self.add_five_poly(k, k, p, np.ones(len(k)), pk)
-                )
+                shape, poly = self._add_poly(k, k, p, ones, pk)
                 if self.marg:
-                    pk = [np.zeros(len(k))] * 6
+                    pk = [zeros] * 6
                 else:
                     for pole in self.poly_poles:
-                        pk[pole] += shape[pole]
+                        pk[pole] = pk[pole] + shape[pole]
 
         return kprime, pk, poly
 
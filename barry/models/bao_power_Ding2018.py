@@ -1,10 +1,31 @@
 import logging
-from functools import lru_cache
+from collections import OrderedDict
 import numpy as np
 from scipy import integrate
 from scipy.special import jn
 from barry.models.bao_power import PowerSpectrumFit
-from scipy.interpolate import splev, splrep
+from barry.models._ding_kernels import load_kernels
+from scipy.interpolate import CubicSpline
+
+try:
+    import numexpr as ne
+except ImportError:  # numexpr is optional, we fall back to plain numpy
+    ne = None
+
+
+def _apply_propagator(pk_smooth, pk_ratio, propagator):
+    """Returns pk_smooth * (1 + pk_ratio * propagator), fused into a single pass when numexpr is available"""
+    if ne is None:
+        return pk_smooth * (1.0 + pk_ratio * propagator)
+    # numexpr treats literal constants as double, which would upcast single precision grids
+    return ne.evaluate(
+        "pk_smooth * (one + pk_ratio * propagator)",
+        local_dict={"pk_smooth": pk_smooth, "pk_ratio": pk_ratio, "propagator": propagator, "one": np.float32(1.0)},
+    )
+
+
+# Fused propagator kernels, either compiled ahead of time or JIT compiled with numba. None if neither is available.
+_propagator_recon_iso, _propagator_aniso_recon, _kernels_threadsafe = load_kernels()
 
 
 class PowerDing2018(PowerSpectrumFit):
@@ -14,6 +35,20 @@ class PowerDing2018(PowerSpectrumFit):
 
     """
 
+    # Number of damping grids cached per dataset. See _damping_cached for when caching helps
+    damping_cache_size_per_data = 16
+
+    # Number of splines and k^2 grids to cache. These only accumulate when om is free, one pair per value of om,
+    # so this keeps a handful of recent values. See _cached_on
+    derived_cache_size = 16
+
+    # The parallel JIT kernels can't be launched from the dataset threads, so we compute datasets serially when using them
+    threadsafe = _kernels_threadsafe
+
+    # Compute the damping and propagator grids in single precision, which is well within the accuracy needed for fitting.
+    # Set to False to fall back to double precision, e.g., to check the chi2 of a fit doesn't change.
+    use_fp32 = True
+
     def __init__(
         self,
         name="Pk Ding 2018",
@@ -59,6 +94,31 @@ class PowerDing2018(PowerSpectrumFit):
 
         self.set_marg(fix_params, poly_poles, n_poly)
 
+        # These are invariant and enter every damping grid, so we square them once
+        self._mu2 = self.mu**2
+        self._one_minus_mu2 = 1.0 - self._mu2
+
+        # Single precision copies for the isotropic (mu, k) grids and their integration over mu
+        self._mu2_f32 = self._mu2.astype(np.float32)
+        self._simps_w_mu_f32 = self._simps_w_mu.astype(np.float32)
+
+        # Damping grids, keyed on (data_name, kind, quantised growth, quantised om). See _damping_cached.
+        self._damping_cache = OrderedDict()
+        self._damping_cache_size = self.damping_cache_size_per_data
+
+        # Splines and k^2 grids derived from the cosmology or kvals. See _cached_on
+        self._derived = {}
+
+    def set_data(self, data, parent=False):
+        super().set_data(data, parent=parent)
+        for d in self.data_dict.values():
+            if "ks_input" in d:  # Not present when we are the parent of a correlation function model
+                d["ks2_input"] = d["ks_input"] ** 2
+
+        # Give each dataset its own share of the cache so alternating between them doesn't evict everything
+        self._damping_cache_size = self.damping_cache_size_per_data * max(1, len(self.data_dict))
+        self._damping_cache.clear()
+
     def precompute(self, camb, om, h0):
 
         c = camb.get_data(om, h0)
@@ -68,93 +128,133 @@ class PowerDing2018(PowerSpectrumFit):
         j0 = jn(0, r_drag * ks)
         s = camb.smoothing_kernel
 
+        integrands = (
+            np.stack(
+                [
+                    1.0 - j0,
+                    (1.0 - s) ** 2 * (1.0 - j0),
+                    0.5 * (s**2 + (1.0 - s) ** 2) + j0 * s * (1.0 - s),  # Corrected for sign error in front of j0.
+                    s**2 * (1.0 - j0),
+                ]
+            )
+            * pk_lin
+        )
+        sigma_nl, sigma_dd_nl, sigma_sd_nl, sigma_ss_nl = integrate.simps(integrands, ks, axis=1) / (6.0 * np.pi**2)
+
         return {
-            "sigma_nl": integrate.simps(pk_lin * (1.0 - j0), ks) / (6.0 * np.pi**2),
-            "sigma_dd_nl": integrate.simps(pk_lin * (1.0 - s) ** 2 * (1.0 - j0), ks) / (6.0 * np.pi**2),
-            "sigma_sd_nl": integrate.simps(pk_lin * (0.5 * (s**2 + (1.0 - s) ** 2) + j0 * s * (1.0 - s)), ks)
-            / (6.0 * np.pi**2),  # Corrected for sign error in front of j0.
-            "sigma_ss_nl": integrate.simps(pk_lin * s**2 * (1.0 - j0), ks) / (6.0 * np.pi**2),
+            "sigma_nl": sigma_nl,
+            "sigma_dd_nl": sigma_dd_nl,
+            "sigma_sd_nl": sigma_sd_nl,
+            "sigma_ss_nl": sigma_ss_nl,
         }
 
-    @lru_cache(maxsize=4)
-    def get_damping(self, growth, om):
-        return np.exp(-np.outer(1.0 + (2.0 + growth) * growth * self.mu**2, self.camb.ks**2) * self.get_pregen("sigma_nl", om))
+    def _cached_on(self, key, sources, build):
+        """Returns build(), cached on key and the identity of the objects it is derived from (sources), so it is rebuilt
+        if, e.g., set_data loads a new cosmology or kvals are set. The sources are kept alive alongside the cached value
+        so their ids can't be reused."""
+        full_key = (key, tuple(id(source) for source in sources))
+        cached = self._derived.get(full_key)
+        if cached is None:
+            if len(self._derived) >= self.derived_cache_size:
+                self._derived.clear()
+            cached = (sources, build())
+            self._derived[full_key] = cached
+        return cached[1]
+
+    def _spline_smoothing_kernel(self):
+        ks, smoothing_kernel = self.camb.ks, self.camb.smoothing_kernel
+        return self._cached_on("smoothing_kernel", (ks, smoothing_kernel), lambda: CubicSpline(ks, smoothing_kernel))
+
+    def _spline_pk_smooth(self, om):
+        if self.kvals is None or self.pksmooth is None or self.pkratio is None:
+            camb = self.camb
+            return self._cached_on(("pk_smooth", om), (camb,), lambda: CubicSpline(camb.ks, self.compute_basic_power_spectrum(om)[0]))
+        kvals, pksmooth = self.kvals, self.pksmooth
+        return self._cached_on("pk_smooth", (kvals, pksmooth), lambda: CubicSpline(kvals, pksmooth))
 
-    @lru_cache(maxsize=4)
-    def get_damping_dd(self, growth, om):
-        return np.exp(-np.outer(1.0 + (2.0 + growth) * growth * self.mu**2, self.camb.ks**2) * self.get_pregen("sigma_dd_nl", om))
+    def _spline_pk_ratio(self, om):
+        if self.kvals is None or self.pksmooth is None or self.pkratio is None:
+            camb = self.camb
+            return self._cached_on(("pk_ratio", om), (camb,), lambda: CubicSpline(camb.ks, self.compute_basic_power_spectrum(om)[1]))
+        kvals, pkratio = self.kvals, self.pkratio
+        return self._cached_on("pk_ratio", (kvals, pkratio), lambda: CubicSpline(kvals, pkratio))
 
-    @lru_cache(maxsize=4)
-    def get_damping_sd(self, growth, om):
-        return np.exp(-np.outer(1.0 + growth * self.mu**2, self.camb.ks**2) * self.get_pregen("sigma_sd_nl", om))
+    def _ks2(self, dtype=np.float64):
+        ks = self.camb.ks
+        return self._cached_on(("ks2", dtype), (ks,), lambda: (ks**2).astype(dtype, copy=False))
 
-    @lru_cache(maxsize=4)
-    def get_damping_ss(self, om):
-        return np.exp(-np.tile(self.camb.ks**2, (self.nmu, 1)) * self.get_pregen("sigma_ss_nl", om))
+    @property
+    def _grid_dtype(self):
+        return np.float32 if self.use_fp32 else np.float64
 
-    @lru_cache(maxsize=4)
-    def get_damping_aniso_par(self, growth, om, data_name=None):
-        if data_name is None:
-            ks = self.camb.ks
-        else:
-            ks = self.data_dict[data_name]["ks_input"]
-        return np.exp(-np.outer((1.0 + (2.0 + growth) * growth) * ks**2, self.mu**2) * self.get_pregen("sigma_nl", om))
+    def _get_ks2(self, data_name=None):
+        return self._ks2() if data_name is None else self.data_dict[data_name]["ks2_input"]
 
-    @lru_cache(maxsize=4)
-    def get_damping_aniso_perp(self, om, data_name=None):
-        if data_name is None:
-            ks = self.camb.ks
-        else:
-            ks = self.data_dict[data_name]["ks_input"]
-        return np.exp(-np.outer(ks**2, 1.0 - self.mu**2) * self.get_pregen("sigma_nl", om))
+    def _damping_cached(self, kind, q_om, q_growth=None, data_name=None):
+        """Shared LRU cache for all the damping grids below, keyed on om and growth quantised to integer multiples of 1e-5
+        (and the precision, in case use_fp32 is changed after construction).
 
-    @lru_cache(maxsize=4)
-    def get_damping_aniso_dd_par(self, growth, om, data_name=None):
-        if data_name is None:
-            ks = self.camb.ks
-        else:
-            ks = self.data_dict[data_name]["ks_input"]
-        return np.exp(-np.outer((1.0 + (2.0 + growth) * growth) * ks**2, self.mu**2) * self.get_pregen("sigma_dd_nl", om))
+        This only helps when growth (b * beta) is fixed or revisited, e.g., when evaluating the same parameters repeatedly.
+        When b is sampled (as it is even with marg="full"), growth is new on almost every step and the grids that depend
+        on it are recomputed regardless, so the cache is kept small: isotropic entries are ~1MB each.
 
-    @lru_cache(maxsize=4)
-    def get_damping_aniso_dd_perp(self, om, data_name=None):
+        """
+        key = (data_name, kind, q_growth, q_om, self.use_fp32)
+        with self._lock:  # Datasets may be computed in parallel threads
+            grid = self._damping_cache.get(key)
+            if grid is not None:
+                self._damping_cache.move_to_end(key)
+                return grid
+
+        om = q_om / 1.0e5
+        args = (om,) if q_growth is None else (q_growth / 1.0e5, om)
         if data_name is None:
-            ks = self.camb.ks
+            grid = getattr(self, kind)(*args)
         else:
-            ks = self.data_dict[data_name]["ks_input"]
-        return np.exp(-np.outer(ks**2, 1.0 - self.mu**2) * self.get_pregen("sigma_dd_nl", om))
+            grid = getattr(self, kind)(*args, data_name=data_name)
 
-    @lru_cache(maxsize=4)
-    def get_damping_aniso_sd_par(self, growth, om, data_name=None):
-        if data_name is None:
-            ks = self.camb.ks
-        else:
-            ks = self.data_dict[data_name]["ks_input"]
-        return np.exp(-np.outer((1.0 + growth) * ks**2, self.mu**2) * self.get_pregen("sigma_sd_nl", om))
+        with self._lock:
+            self._damping_cache[key] = grid
+            if len(self._damping_cache) > self._damping_cache_size:
+                self._damping_cache.popitem(last=False)
+        return grid
 
-    @lru_cache(maxsize=4)
-    def get_damping_aniso_sd_perp(self, om, data_name=None):
-        if data_name is None:
-            ks = self.camb.ks
-        else:
-            ks = self.data_dict[data_name]["ks_input"]
-        return np.exp(-np.outer(ks**2, 1.0 - self.mu**2) * self.get_pregen("sigma_sd_nl", om))
+    def get_damping(self, growth, om):
+        a = -(1.0 + (2.0 + growth) * growth * self._mu2) * self.get_pregen("sigma_nl", om)
+        return np.exp(a[:, None] * self._ks2()).astype(self._grid_dtype, copy=False)
 
-    @lru_cache(maxsize=4)
-    def get_damping_aniso_ss_par(self, om, data_name=None):
-        if data_name is None:
-            ks = self.camb.ks
-        else:
-            ks = self.data_dict[data_name]["ks_input"]
-        return np.exp(-np.outer(ks**2, self.mu**2) * self.get_pregen("sigma_ss_nl", om))
+    def get_damping_dd(self, growth, om):
+        a = -(1.0 + (2.0 + growth) * growth * self._mu2) * self.get_pregen("sigma_dd_nl", om)
+        return np.exp(a[:, None] * self._ks2()).astype(self._grid_dtype, copy=False)
 
-    @lru_cache(maxsize=4)
-    def get_damping_aniso_ss_perp(self, om, data_name=None):
-        if data_name is None:
-            ks = self.camb.ks
-        else:
-            ks = self.data_dict[data_name]["ks_input"]
-        return np.exp(-np.outer(ks**2, 1.0 - self.mu**2) * self.get_pregen("sigma_ss_nl", om))
+    def get_damping_sd(self, growth, om):
+        a = -(1.0 + growth * self._mu2) * self.get_pregen("sigma_sd_nl", om)
+        return np.exp(a[:, None] * self._ks2()).astype(self._grid_dtype, copy=False)
+
+    def get_damping_ss(self, om):
+        # Independent of mu, so only exponentiate along k
+        return np.tile(np.exp(-self.get_pregen("sigma_ss_nl", om) * self._ks2()).astype(self._grid_dtype, copy=False), (self.nmu, 1))
+
+    def _log_damping_aniso_par(self, growth, om, data_name=None):
+        a = -(1.0 + (2.0 + growth) * growth) * self.get_pregen("sigma_nl", om) * self._mu2
+        return (self._get_ks2(data_name)[:, None] * a).astype(self._grid_dtype, copy=False)
+
+    def _log_damping_aniso_perp(self, om, data_name=None):
+        a = -self.get_pregen("sigma_nl", om) * self._one_minus_mu2
+        return (self._get_ks2(data_name)[:, None] * a).astype(self._grid_dtype, copy=False)
+
+    def _compute_log_dampings(self, growth, om, data_name=None):
+        """The parallel and perpendicular log damping grids for the dd, sd and ss terms, stacked as a (2, 3, nk, nmu) array
+        so that all three post-reconstruction dampings can be computed with a single exponential"""
+        sigma_dd, sigma_sd, sigma_ss = (self.get_pregen(name, om) for name in ("sigma_dd_nl", "sigma_sd_nl", "sigma_ss_nl"))
+        a_par = -np.array([(1.0 + (2.0 + growth) * growth) * sigma_dd, (1.0 + growth) * sigma_sd, sigma_ss])[:, None] * self._mu2
+        a_perp = -np.array([sigma_dd, sigma_sd, sigma_ss])[:, None] * self._one_minus_mu2
+
+        ks2 = self._get_ks2(data_name)[:, None]
+        log_dampings = np.empty((2, 3, len(ks2), self.nmu), dtype=self._grid_dtype)
+        np.multiply(ks2, a_par[:, None, :], out=log_dampings[0])
+        np.multiply(ks2, a_perp[:, None, :], out=log_dampings[1])
+        return log_dampings
 
     def declare_parameters(self):
         super().declare_parameters()
@@ -200,150 +300,163 @@ class PowerDing2018(PowerSpectrumFit):
 
         """
 
-        # Get the basic power spectrum components
+        # Get the basic power spectrum components. k^2 is in the precision of the (mu, k) grids
+        dtype = self._grid_dtype
         if self.kvals is None or self.pksmooth is None or self.pkratio is None:
-            ks = self.camb.ks
+            ks, ks2 = self.camb.ks, self._ks2(dtype)
             pk_smooth_lin, pk_ratio = self.compute_basic_power_spectrum(p["om"])
         else:
-            ks = self.kvals
+            ks, ks2 = self.kvals, (self.kvals**2).astype(dtype)
             pk_smooth_lin, pk_ratio = self.pksmooth, self.pkratio
 
         if not for_corr:
             if "b" not in p:
                 p = self.deal_with_ndata(p, 0)
 
+        zeros, ones = self.get_zeros_ones(len(k))
         if self.isotropic:
 
-            pk = [np.zeros(len(k))]
+            pk = [zeros]
+            pk_smooth_lin, pk_ratio = np.asarray(pk_smooth_lin, dtype=dtype), np.asarray(pk_ratio, dtype=dtype)
 
             kprime = k if for_corr else k / p["alpha"]
+            mu2, w_mu = (self._mu2_f32, self._simps_w_mu_f32) if self.use_fp32 else (self._mu2, self._simps_w_mu)
 
-            # Compute the smooth model
-            fog = 1.0 / (1.0 + np.outer(self.mu**2, ks**2 * p["sigma_s"] ** 2 / 2.0)) ** 2
-            pk_smooth = p["b"] ** 2 * pk_smooth_lin * fog
+            # Compute the smooth model. Parameters are cast to python floats so they can't promote the grids to double precision.
+            fog = 1.0 / (1.0 + np.outer(mu2, ks2 * float(p["sigma_s"]) ** 2 / 2.0)) ** 2
+            pk_smooth = float(p["b"]) ** 2 * pk_smooth_lin * fog
 
             if smooth:
-                propagator = np.zeros(len(ks))
+                propagator = np.zeros(len(ks), dtype=dtype)
             else:
-                # Lets round some things for the sake of numerical speed
-                om = np.round(p["om"], decimals=5)
-                growth = np.round(p["b"] * p["beta"], decimals=5)
+                # Lets quantise some things so the damping grids can be cached
+                q_om = round(1.0e5 * float(p["om"]))
+                q_growth = round(1.0e5 * float(p["b"] * p["beta"]))
 
                 # Compute the BAO damping
                 if self.recon:
-                    damping_dd = self.get_damping_dd(growth, om)
-                    damping_sd = self.get_damping_sd(growth, om)
-                    damping_ss = self.get_damping_ss(om)
-
-                    smooth_prefac = np.tile(self.camb.smoothing_kernel / p["b"], (self.nmu, 1))
-                    bdelta_prefac = np.tile(0.5 * p["b_delta"] / p["b"] * ks**2, (self.nmu, 1))
-                    kaiser_prefac = (
-                        1.0 - smooth_prefac + np.outer(p["beta"] * self.mu**2, 1.0 - self.camb.smoothing_kernel) + bdelta_prefac
-                    )
-                    propagator = (
-                        (kaiser_prefac**2 - bdelta_prefac**2) * damping_dd
-                        + 2.0 * kaiser_prefac * smooth_prefac * damping_sd
-                        + smooth_prefac**2 * damping_ss
-                    )
+                    damping_dd = self._damping_cached("get_damping_dd", q_om, q_growth, None)
+                    damping_sd = self._damping_cached("get_damping_sd", q_om, q_growth, None)
+                    damping_ss = self._damping_cached("get_damping_ss", q_om, None, None)
+
+                    # The kernels don't check their inputs, so use numpy (which does) unless all the grids line up
+                    if (
+                        _propagator_recon_iso is not None
+                        and damping_dd.shape == (self.nmu, len(ks))
+                        and len(self.camb.smoothing_kernel) == len(ks)
+                    ):
+                        propagator = _propagator_recon_iso(
+                            self.mu,
+                            ks,
+                            self.camb.smoothing_kernel,
+                            damping_dd,
+                            damping_sd,
+                            damping_ss,
+                            p["beta"],
+                            p["b"],
+                            p["b_delta"],
+                        )
+                    else:
+                        # The k-only prefactors are left 1D and broadcast against the (mu, k) grids
+                        smooth_prefac = (self.camb.smoothing_kernel / float(p["b"])).astype(dtype, copy=False)
+                        bdelta_prefac = 0.5 * float(p["b_delta"]) / float(p["b"]) * ks2
+                        kaiser_prefac = (
+                            1.0 - smooth_prefac + np.outer(float(p["beta"]) * mu2, 1.0 - self.camb.smoothing_kernel) + bdelta_prefac
+                        ).astype(dtype, copy=False)
+                        propagator = (
+                            (kaiser_prefac**2 - bdelta_prefac**2) * damping_dd
+                            + 2.0 * kaiser_prefac * smooth_prefac * damping_sd
+                            + smooth_prefac**2 * damping_ss
+                        )
                 else:
-                    damping = self.get_damping(growth, om)
-                    bdelta_prefac = np.tile(0.5 * p["b_delta"] / p["b"] * ks**2, (self.nmu, 1))
-                    kaiser_prefac = 1.0 + np.tile(p["beta"] * self.mu**2, (len(ks), 1)).T + bdelta_prefac
+                    damping = self._damping_cached("get_damping", q_om, q_growth, None)
+                    bdelta_prefac = 0.5 * float(p["b_delta"]) / float(p["b"]) * ks2
+                    kaiser_prefac = 1.0 + (float(p["beta"]) * mu2)[:, None] + bdelta_prefac
                     propagator = (kaiser_prefac**2 - bdelta_prefac**2) * damping
 
-            if smooth:
-                prefac = np.ones(len(kprime))
-            else:
-                prefac = splev(kprime, splrep(ks, integrate.simps((1.0 + pk_ratio * propagator), self.mu, axis=0)))
-
             if for_corr:
                 poly = None
-                pk1d = integrate.simps(pk_smooth * (1.0 + pk_ratio * propagator), self.mu, axis=0)
+                pk1d = w_mu @ _apply_propagator(pk_smooth, pk_ratio, propagator)
             else:
-                shape, poly = (
-                    self.add_three_poly(ks, k, p, prefac, np.zeros(len(k)))
-                    if self.n_poly == 3
-                    else self.add_five_poly(ks, k, p, prefac, np.zeros(len(k)))
-                )
+                if smooth:
+                    prefac = ones
+                else:
+                    prefac = CubicSpline(ks, w_mu @ _apply_propagator(dtype(1.0), pk_ratio, propagator))(kprime)
+                shape, poly = self._add_poly(ks, k, p, prefac, zeros)
                 if self.marg:
                     poly = poly[1:]  # Remove the bias marginalisation.
-                pk1d = integrate.simps((pk_smooth + shape) * (1.0 + pk_ratio * propagator), self.mu, axis=0)
+                pk1d = w_mu @ _apply_propagator(pk_smooth + shape.astype(dtype, copy=False), pk_ratio, propagator)
 
-            pk[0] = splev(kprime, splrep(ks, pk1d))
+            pk1d = pk1d.astype(np.float64, copy=False)
+            pk[0] = pk1d if for_corr and self.on_input_grid(kprime, ks) else CubicSpline(ks, pk1d)(kprime)
 
         else:
-            epsilon = np.round(p["epsilon"], decimals=5)
+            epsilon = round(float(p["epsilon"]), 5)
             kprime = np.tile(k, (self.nmu, 1)).T if for_corr else np.outer(k / p["alpha"], self.get_kprimefac(epsilon))
             muprime = self.get_muprime(epsilon)
             fog = 1.0 / (1.0 + muprime**2 * kprime**2 * p["sigma_s"] ** 2 / 2.0) ** 2
 
-            # Lets round some things for the sake of numerical speed
-            om = np.round(p["om"], decimals=5)
-            growth = np.round(p["b"] * p["beta"], decimals=5)
+            # Lets quantise some things so the damping grids can be cached
+            q_om = round(1.0e5 * float(p["om"]))
+            q_growth = round(1.0e5 * float(p["b"] * p["beta"]))
 
-            sprime = splev(kprime, splrep(ks, self.camb.smoothing_kernel)) if self.recon else 0.0
+            sprime = self._spline_smoothing_kernel()(kprime) if self.recon else 0.0
             kaiser_prefac = 1.0 + p["beta"] * muprime**2 * (1.0 - sprime)
 
-            pk_smooth = p["b"] ** 2 * kaiser_prefac**2 * splev(kprime, splrep(ks, pk_smooth_lin)) * fog
+            pk_smooth = p["b"] ** 2 * kaiser_prefac**2 * self._spline_pk_smooth(p["om"])(kprime) * fog
 
             if smooth:
                 pk2d = pk_smooth
             else:
                 # Compute the BAO damping
-                power_par = 1.0 / (p["alpha"] ** 2 * (1.0 + epsilon) ** 4)
-                power_perp = (1.0 + epsilon) ** 2 / p["alpha"] ** 2
-                bdelta_prefac = 0.5 * p["b_delta"] / (p["b"] * kaiser_prefac) * kprime**2
+                power_par = 1.0 / (float(p["alpha"]) ** 2 * (1.0 + epsilon) ** 4)
+                power_perp = (1.0 + epsilon) ** 2 / float(p["alpha"]) ** 2
                 if self.recon:
-                    damping_dd = (
-                        self.get_damping_aniso_dd_par(growth, om, data_name=data_name) ** power_par
-                        * self.get_damping_aniso_dd_perp(om, data_name=data_name) ** power_perp
-                    )
-                    damping_sd = (
-                        self.get_damping_aniso_sd_par(growth, om, data_name=data_name) ** power_par
-                        * self.get_damping_aniso_sd_perp(om, data_name=data_name) ** power_perp
-                    )
-                    damping_ss = (
-                        self.get_damping_aniso_ss_par(om, data_name=data_name) ** power_par
-                        * self.get_damping_aniso_ss_perp(om, data_name=data_name) ** power_perp
-                    )
+                    log_dampings = self._damping_cached("_compute_log_dampings", q_om, q_growth, data_name)
+                    dampings = power_par * log_dampings[0]
+                    dampings += power_perp * log_dampings[1]
+                    damping_dd, damping_sd, damping_ss = np.exp(dampings, out=dampings)
 
                     # Compute propagator
-                    smooth_prefac = sprime / (p["b"] * kaiser_prefac)
-                    propagator = (
-                        ((1.0 + bdelta_prefac - smooth_prefac) ** 2 - bdelta_prefac**2) * damping_dd
-                        + 2.0 * (1.0 + bdelta_prefac - smooth_prefac) * smooth_prefac * damping_sd
-                        + smooth_prefac**2 * damping_ss
-                    )
+                    if _propagator_aniso_recon is not None and damping_dd.shape == kprime.shape:
+                        propagator = _propagator_aniso_recon(
+                            kprime, sprime, kaiser_prefac, damping_dd, damping_sd, damping_ss, p["b"], p["b_delta"]
+                        )
+                    else:
+                        bdelta_prefac = 0.5 * p["b_delta"] / (p["b"] * kaiser_prefac) * kprime**2
+                        smooth_prefac = sprime / (p["b"] * kaiser_prefac)
+                        propagator = (
+                            ((1.0 + bdelta_prefac - smooth_prefac) ** 2 - bdelta_prefac**2) * damping_dd
+                            + 2.0 * (1.0 + bdelta_prefac - smooth_prefac) * smooth_prefac * damping_sd
+                            + smooth_prefac**2 * damping_ss
+                        )
                 else:
-                    damping = (
-                        self.get_damping_aniso_par(growth, om, data_name=data_name) ** power_par
-                        * self.get_damping_aniso_perp(om, data_name=data_name) ** power_perp
+                    damping = np.exp(
+                        power_par * self._damping_cached("_log_damping_aniso_par", q_om, q_growth, data_name)
+                        + power_perp * self._damping_cached("_log_damping_aniso_perp", q_om, None, data_name)
                     )
 
                     # Compute propagator
+                    bdelta_prefac = 0.5 * p["b_delta"] / (p["b"] * kaiser_prefac) * kprime**2
                     propagator = (1.0 + 2.0 * bdelta_prefac) * damping
 
-                pk2d = pk_smooth * (1.0 + splev(kprime, splrep(ks, pk_ratio)) * propagator)
+                pk2d = _apply_propagator(pk_smooth, self._spline_pk_ratio(p["om"])(kprime), propagator)
 
             pk0, pk2, pk4 = self.integrate_mu(pk2d)
 
             # Polynomial shape
-            pk = [pk0, np.zeros(len(k)), pk2, np.zeros(len(k)), pk4, np.zeros(len(k))]
+            pk = [pk0, zeros, pk2, zeros, pk4, zeros]
 
             if for_corr:
                 poly = None
                 kprime = k
             else:
-                shape, poly = (
-                    self.add_three_poly(k, k, p, np.ones(len(k)), pk)
-                    if self.n_poly == 3
-                    else self.add_five_poly(k, k, p, np.ones(len(k)), pk)
-                )
+                shape, poly = self._add_poly(k, k, p, ones, pk)
                 if self.marg:
                     poly = poly[1:]  # Remove the bias marginalisation.
                 else:
                     for pole in self.poly_poles:
-                        pk[pole] += shape[pole]
+                        pk[pole] = pk[pole] + shape[pole]
 
         return kprime, pk, poly
 
@@ -216,10 +216,11 @@ class PowerSeo2016(PowerSpectrumFit):
             if "b" not in p:
                 p = self.deal_with_ndata(p, 0)
 
+        zeros, ones = self.get_zeros_ones(len(k))
         # We split for isotropic and anisotropic here. They are coded up quite differently to try and make things fast
         if self.isotropic:
 
-            pk = [np.zeros(len(k))]
+            pk = [zeros]
 
             kprime = k if for_corr else k / p["alpha"]
 
@@ -257,26 +258,21 @@ class PowerSeo2016(PowerSpectrumFit):
                     )
                     propagator = ((prefac_k + prefac_mu) * damping) ** 2
 
-            if smooth:
-                prefac = np.ones(len(kprime))
-            else:
-                prefac = splev(kprime, splrep(ks, integrate.simps((1.0 + pk_ratio * propagator), self.mu, axis=0)))
-
             if for_corr:
                 poly = None
                 pk1d = integrate.simps(pk_smooth * (1.0 + pk_ratio * propagator), self.mu, axis=0)
             else:
-                shape, poly = (
-                    self.add_three_poly(ks, k, p, prefac, np.zeros(len(k)))
-                    if self.n_poly == 3
-                    else self.add_five_poly(ks, k, p, prefac, np.zeros(len(k)))
-                )
+                if smooth:
+                    prefac = ones
+                else:
+                    prefac = splev(kprime, splrep(ks, integrate.simps((1.0 + pk_ratio * propagator), self.mu, axis=0)))
+                shape, poly = self._add_poly(ks, k, p, prefac, zeros)
 
                 if self.marg:
                     poly = poly[1:]  # Remove the bias marginalisation.
                 pk1d = integrate.simps((pk_smooth + shape) * (1.0 + pk_ratio * propagator), self.mu, axis=0)
 
-            pk[0] = splev(kprime, splrep(ks, pk1d))
+            pk[0] = pk1d if for_corr and self.on_input_grid(kprime, ks) else splev(kprime, splrep(ks, pk1d))
 
         else:
             epsilon = np.round(p["epsilon"], decimals=5)
@@ -332,22 +328,18 @@ class PowerSeo2016(PowerSpectrumFit):
             pk0, pk2, pk4 = self.integrate_mu(pk2d)
 
             # Polynomial shape
-            pk = [pk0, np.zeros(len(k)), pk2, np.zeros(len(k)), pk4, np.zeros(len(k))]
+            pk = [pk0, zeros, pk2, zeros, pk4, zeros]
 
             if for_corr:
                 poly = None
                 kprime = k
             else:
-                shape, poly = (
-                    self.add_three_poly(k, k, p, np.ones(len(k)), pk)
-                    if self.n_poly == 3
-                    else self.add_five_poly(k, k, p, np.ones(len(k)), pk)
-                )
+                shape, poly = self._add_poly(k, k, p, ones, pk)
                 if self.marg:
                     poly = poly[1:]  # Remove the bias marginalisation.
                 else:
                     for pole in self.poly_poles:
-                        pk[pole] += shape[pole]
+                        pk[pole] = pk[pole] + shape[pole]
 
         return kprime, pk, poly
 
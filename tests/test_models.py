@@ -3,9 +3,18 @@ from barry.datasets.dataset_correlation_function import CorrelationFunction_ROSS
 from barry.models.model import Model
 from barry.models.bao_power import PowerSpectrumFit
 from barry.models.bao_correlation import CorrelationFunctionFit
+from barry.models import bao_power_Ding2018
+from barry.models.bao_power_Ding2018 import PowerDing2018
+from barry.models._ding_kernels import propagator_recon_iso, propagator_aniso_recon
+from scipy.integrate import simps
 
 from tests.utils import get_concrete
+from collections import OrderedDict
 import numpy as np
+import os
+import pickle
+import subprocess
+import sys
 
 
 class TestModels:
@@ -56,3 +65,151 @@ class TestModels:
                     params = c.get_raw_start()
                     posterior = c.get_posterior(params)
                     assert np.isfinite(posterior), f"Model {str(c)} at params {params} gave posterior {posterior}"
+
+    def test_pk_integrate_mu_matches_simpson(self):
+        np.random.seed(0)
+        for c in self.concrete:
+            if isinstance(c, PowerSpectrumFit):
+                pk2d = np.random.rand(50, c.nmu)
+                pk0 = simps(pk2d, c.mu, axis=1)
+                pk2 = 3.0 * simps(pk2d * c.mu**2, c.mu, axis=1)
+                pk4 = 1.125 * (35.0 * simps(pk2d * c.mu**4, c.mu, axis=1) - 10.0 * pk2 + 3.0 * pk0)
+                pk2 = 2.5 * (pk2 - pk0)
+                for pk, expected in zip(c.integrate_mu(pk2d), [pk0, pk2, pk4]):
+                    assert np.allclose(pk, expected, rtol=1.0e-10, atol=0.0), f"Model {str(c)} integrates mu incorrectly"
+                assert np.allclose(c.integrate_mu(pk2d, isotropic=True)[0], pk0, rtol=1.0e-10, atol=0.0)
+
+    def test_pk_poly_terms_match_explicit_formulas(self):
+        np.random.seed(0)
+        k = np.linspace(0.01, 0.3, 30)
+        prefac = 1.0 + k
+        for isotropic in [True, False]:
+            for recon in [None, "iso"]:
+                for marg in [None, "full"]:
+                    for n_poly in [3, 5]:
+                        model = PowerDing2018(isotropic=isotropic, recon=recon, marg=marg, n_poly=n_poly)
+                        p = {f"a{{{pole}}}_{i + 1}": np.random.rand() for pole in model.poly_poles for i in range(n_poly)}
+                        first = k**2 if (recon is not None or not isotropic) else k
+                        terms = [first, np.ones(len(k)), 1.0 / k, 1.0 / (k * k), 1.0 / (k**3)][:n_poly]
+
+                        if isotropic:
+                            pk = 1000.0 / k
+                            expected_shape = sum(p[f"a{{0}}_{i + 1}"] * term for i, term in enumerate(terms))
+                            expected_poly = (prefac * np.array([pk] + terms) if marg else np.zeros((1, len(k))))[:, None, :]
+                        else:
+                            pk = [1000.0 / k] * 6
+                            expected_shape = np.zeros((6, len(k)))
+                            if marg:
+                                expected_poly = np.zeros((n_poly * len(model.poly_poles) + 1, 6, len(k)))
+                                expected_poly[0] = pk
+                                for i, pole in enumerate(model.poly_poles):
+                                    expected_poly[n_poly * i + 1 : n_poly * (i + 1) + 1, pole] = terms
+                            else:
+                                expected_poly = np.zeros((1, 6, len(k)))
+                                for pole in model.poly_poles:
+                                    expected_shape[pole] = sum(p[f"a{{{pole}}}_{i + 1}"] * term for i, term in enumerate(terms))
+
+                        shape, poly = model._add_poly(k, k, p, prefac, pk)
+                        msg = f"Polynomial terms differ for isotropic={isotropic}, recon={recon}, marg={marg}, n_poly={n_poly}"
+                        assert np.allclose(shape, expected_shape, rtol=1.0e-10, atol=0.0), msg
+                        assert np.allclose(poly, expected_poly, rtol=1.0e-10, atol=0.0), msg
+
+    def check_batch_in_threads_matches_serial(self, c, monkeypatch):
+        data = c.data[0]
+        p = c.deal_with_ndata(c.get_param_dict(c.get_defaults()), 0)
+        ps = [p, dict(p, alpha=1.02 * p["alpha"])]
+        results = []
+        for parallel in [False, True]:
+            monkeypatch.setattr(c, "parallel_datasets", parallel)
+            results.append(c.compute_power_spectrum_batch(data["ks_input"], ps, data_name=data["name"]))
+        for (k_serial, pk_serial, poly_serial), (k_threads, pk_threads, poly_threads) in zip(*results):
+            assert np.array_equal(k_serial, k_threads), f"Model {str(c)} gives different k in threads"
+            for pole_serial, pole_threads in zip(pk_serial, pk_threads):
+                assert np.array_equal(pole_serial, pole_threads), f"Model {str(c)} gives different P(k) in threads"
+            assert np.array_equal(poly_serial, poly_threads), f"Model {str(c)} gives different polynomials in threads"
+
+    def test_pk_batch_in_threads_matches_serial(self, monkeypatch):
+        monkeypatch.setattr(os, "cpu_count", lambda: 4)  # So the batch is computed in threads even on a single core
+        for c in self.concrete:
+            if isinstance(c, PowerSpectrumFit):
+                self.check_batch_in_threads_matches_serial(c, monkeypatch)
+
+    def test_pk_batch_in_threads_matches_serial_ding_without_kernels(self, monkeypatch):
+        # Ding2018 is only computed in threads without the parallel numba kernels. Force that even when numba is
+        # installed, and start from an empty damping cache so the threads fill it concurrently.
+        monkeypatch.setattr(os, "cpu_count", lambda: 4)
+        monkeypatch.setattr(bao_power_Ding2018, "_propagator_recon_iso", None)
+        monkeypatch.setattr(bao_power_Ding2018, "_propagator_aniso_recon", None)
+        for c in self.concrete:
+            if isinstance(c, PowerDing2018):
+                monkeypatch.setattr(c, "threadsafe", True)
+                monkeypatch.setattr(c, "_damping_cache", OrderedDict())
+                self.check_batch_in_threads_matches_serial(c, monkeypatch)
+
+    def test_pk_pickle_round_trip(self, monkeypatch):
+        # Samplers pickle the model to send it to a multiprocessing or MPI pool. Compute a batch in threads first, so
+        # any state that creates is pickled too
+        monkeypatch.setattr(os, "cpu_count", lambda: 4)
+        for c in self.concrete:
+            if isinstance(c, PowerSpectrumFit):
+                data = c.data[0]
+                p = c.deal_with_ndata(c.get_param_dict(c.get_defaults()), 0)
+                expected = c.compute_power_spectrum_batch(data["ks_input"], [p, p], data_name=data["name"])[0]
+                copy = pickle.loads(pickle.dumps(c))
+                k, pk, poly = copy.compute_power_spectrum(data["ks_input"], p, data_name=data["name"])
+                assert np.array_equal(k, expected[0]), f"Model {str(c)} gives different k after pickling"
+                for pole, pole_expected in zip(pk, expected[1]):
+                    assert np.array_equal(pole, pole_expected), f"Model {str(c)} gives different P(k) after pickling"
+                assert np.array_equal(poly, expected[2]), f"Model {str(c)} gives different polynomials after pickling"
+                copy.compute_power_spectrum_batch(data["ks_input"], [p, p], data_name=data["name"])
+
+    def test_pk_threaded_datasets_exit_cleanly(self):
+        # Fit both galactic caps so the datasets are computed in threads (pretending we have several cores), then
+        # make sure the process still exits. Parallel numba kernels launched from the threads can hang it on exit.
+        script = (
+            "import os\n"
+            "os.cpu_count = lambda: 4\n"
+            "from barry.datasets.dataset_power_spectrum import PowerSpectrum_SDSS_DR12\n"
+            "from barry.models import PowerDing2018\n"
+            "for isotropic in [True, False]:\n"
+            "    fit_poles = [0] if isotropic else [0, 2]\n"
+            "    dataset = PowerSpectrum_SDSS_DR12(isotropic=isotropic, recon='iso', galactic_cap='both', fit_poles=fit_poles)\n"
+            "    model = PowerDing2018(recon=dataset.recon, isotropic=isotropic, marg='full', n_data=2)\n"
+            "    model.set_data(dataset.get_data())\n"
+            "    for i in range(5):\n"
+            "        model.get_posterior(model.get_defaults())\n"
+        )
+        result = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.dirname(__file__)), timeout=600)
+        assert result.returncode == 0
+
+
+class TestDing2018Kernels:
+    models = []
+
+    @classmethod
+    def setup_class(cls):
+        for isotropic in [True, False]:
+            dataset = PowerSpectrum_SDSS_DR12(isotropic=isotropic, recon="iso", fit_poles=[0] if isotropic else [0, 2])
+            model = PowerDing2018(recon=dataset.recon, isotropic=isotropic, marg="full")
+            model.set_data(dataset.get_data())
+            cls.models.append(model)
+
+    def test_fused_kernels_match_numpy(self, monkeypatch):
+        # Use the compiled kernels if we have them, otherwise check the pure python versions of the same functions
+        kernels = {"_propagator_recon_iso": propagator_recon_iso, "_propagator_aniso_recon": propagator_aniso_recon}
+        for name in kernels:
+            if getattr(bao_power_Ding2018, name) is not None:
+                kernels[name] = getattr(bao_power_Ding2018, name)
+
+        for model in self.models:
+            data = model.data[0]
+            params = model.get_param_dict(model.get_defaults())
+            for use_fp32, rtol in [(True, 1.0e-5), (False, 1.0e-10)]:
+                monkeypatch.setattr(model, "use_fp32", use_fp32)
+                pks = []
+                for kernel in [kernels, dict.fromkeys(kernels)]:
+                    for name, func in kernel.items():
+                        monkeypatch.setattr(bao_power_Ding2018, name, func)
+                    pks.append(model.compute_power_spectrum(data["ks_input"], params, data_name=data["name"])[1])
+                for pk_kernel, pk_numpy in zip(*pks):
+                    assert np.allclose(pk_kernel, pk_numpy, rtol=rtol, atol=0.0), f"Kernels don't match numpy for use_fp32={use_fp32}"